@@ -0,0 +1,46 @@
+"""Optional kernels compiled with Numba.
+
+Numba is an optional dependency. When it's not installed, the kernel getters below return `None`
+and callers should fall back to their (pure) NumPy implementation. Importing Numba (and compiling
+the kernels) is slow, so this only happens when a kernel is first needed.
+"""
+
+import math
+from functools import lru_cache
+from typing import Any, Callable, Optional, Tuple
+
+import numpy as np
+
+
+def _min_max_std(data: np.ndarray) -> Tuple[Any, Any, float]:
+    """Compute the min, max, and (population) standard deviation of a 1-d array in a single pass.
+
+    The sums are shifted by the first element, which keeps the variance numerically stable without
+    the per-element division of Welford's algorithm (so that the loop can still be vectorised).
+    """
+    data_min = data[0]
+    data_max = data[0]
+    shift = float(data[0])
+    sum_1 = 0.0
+    sum_2 = 0.0
+    for i in range(data.size):
+        x = data[i]
+        data_min = min(data_min, x)
+        data_max = max(data_max, x)
+        delta = float(x) - shift
+        sum_1 += delta
+        sum_2 += delta * delta
+    n = data.size
+    return data_min, data_max, math.sqrt(max(sum_2 / n - (sum_1 / n) ** 2, 0.0))
+
+
+@lru_cache(maxsize=None)
+def get_min_max_std() -> Optional[Callable[[np.ndarray], Tuple[Any, Any, float]]]:
+    try:
+        import numba
+    except ImportError:  # pragma: no cover
+        return None
+    kernel: Callable[[np.ndarray], Tuple[Any, Any, float]] = numba.njit(cache=True, nogil=True)(
+        _min_max_std
+    )
+    return kernel
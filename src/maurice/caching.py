@@ -1,4 +1,128 @@
+import io
+import json
+import os
+import pickle
+import tempfile
 from pathlib import Path
+from types import ModuleType
+from typing import IO, Any, Callable, Dict, Optional, Tuple, cast
 
+import dill
+
+from maurice.utils import HashingWriter, ImportablePickler
+
+# zstandard is an optional dependency, used to compress the stored blobs
+zstandard: Optional[ModuleType]
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
 
 CACHE_DIR = Path.cwd().joinpath(".maurice_cache").absolute()
+# Content-addressed store of pickled payloads, shared by all cache entries
+BLOBS_DIR = CACHE_DIR.joinpath("blobs")
+# Small manifest files mapping each cached method call to its payloads
+INDEX_DIR = CACHE_DIR.joinpath("index")
+
+# Large enough to aggregate the many small writes issued by the pickler
+_IO_BUFFER_SIZE = 1 << 20
+
+# Higher levels compress poorly compressible data (e.g. float arrays) a lot slower
+_ZSTD_LEVEL = 1
+# Every zstd frame starts with these bytes, while pickles start with the PROTO opcode (b"\x80").
+# This is how compressed and uncompressed blobs can live side-by-side in the same store.
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _get_umask() -> int:
+    # There's no way to read the umask without (temporarily) changing it
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# mkstemp() creates owner-only files, while cached files should get the same
+# permissions as any other new file (so that a cache can be shared)
+_FILE_MODE = 0o666 & ~_get_umask()
+
+
+def _mkstemp(dir: Path) -> Tuple[int, str]:
+    fd, tmp_path = tempfile.mkstemp(dir=dir, suffix=".tmp")
+    os.chmod(tmp_path, _FILE_MODE)
+    return fd, tmp_path
+
+
+def _pickle_dump(obj: Any, file: Any) -> None:
+    ImportablePickler(file, protocol=5).dump(obj)
+
+
+def _dump_blob(obj: Any, file: IO[bytes], dump: Callable[[Any, Any], None]) -> str:
+    writer = HashingWriter(file)
+    if zstandard is None:
+        dump(obj, writer)
+    else:
+        compressor = zstandard.ZstdCompressor(level=_ZSTD_LEVEL)
+        with compressor.stream_writer(writer, closefd=False) as compressed_writer:
+            dump(obj, compressed_writer)
+    digest: str = writer.hasher.hexdigest()
+    return digest
+
+
+def store_blob(obj: Any) -> str:
+    """Pickle an object into the blob store and return the digest of its content.
+
+    Identical payloads (e.g. the same fitted state cached under different call arguments) are only
+    stored once.
+    """
+    BLOBS_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = _mkstemp(dir=BLOBS_DIR)
+    try:
+        # Stream the pickled bytes to disk instead of materialising them in memory first
+        with open(fd, "wb", buffering=_IO_BUFFER_SIZE) as f:
+            try:
+                digest = _dump_blob(obj, f, _pickle_dump)
+            except (pickle.PicklingError, AttributeError, TypeError):
+                # Fallback to dill for objects that the standard pickle module can't
+                # handle (or would only store by reference, see ImportablePickler)
+                f.seek(0)
+                f.truncate()
+                digest = _dump_blob(obj, f, dill.dump)
+        blob_path = BLOBS_DIR.joinpath(digest)
+        if not blob_path.exists():
+            os.replace(tmp_path, blob_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return digest
+
+
+def load_blob(digest: str) -> Any:
+    with BLOBS_DIR.joinpath(digest).open("rb", buffering=_IO_BUFFER_SIZE) as f:
+        # Binary files opened with a positive buffer size are always buffered readers
+        file = cast(io.BufferedReader, f)
+        if file.peek(len(_ZSTD_MAGIC)).startswith(_ZSTD_MAGIC):
+            if zstandard is None:
+                raise ImportError(
+                    f"Cached blob {digest} is zstd-compressed, but zstandard is not installed"
+                )
+            file = io.BufferedReader(
+                zstandard.ZstdDecompressor().stream_reader(f, closefd=False),
+                buffer_size=_IO_BUFFER_SIZE,
+            )
+        # dill's Unpickler extends the (C) pickle Unpickler, so it is just as
+        # fast while still being able to load the payloads written by dill
+        return dill.Unpickler(file).load()
+
+
+def write_manifest(path: Path, blobs: Dict[str, str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = _mkstemp(dir=path.parent)
+    with open(fd, "w") as f:
+        json.dump(blobs, f)
+    # Atomically replace the manifest so that readers never see a partial write
+    os.replace(tmp_path, path)
+
+
+def read_manifest(path: Path) -> Dict[str, str]:
+    blobs: Dict[str, str] = json.loads(path.read_text())
+    return blobs
@@ -1,9 +1,12 @@
 import math
+from functools import cached_property
+from typing import Any, Optional, Tuple
 
 import numpy as np
 from matplotlib.figure import Figure
 from scipy.stats import skew
 
+from maurice._kernels import get_min_max_std
 from maurice.types import ArrayLike
 
 
@@ -14,7 +17,11 @@ def is_discrete(data: ArrayLike) -> bool:
     passed, this function returns `True` if and only if all elements do not contain a fractional part.
     """
     data = np.asarray(data)
-    return bool(np.all(np.mod(data, 1) == 0))
+    if np.issubdtype(data.dtype, np.integer) or np.issubdtype(data.dtype, np.bool_):
+        return True
+    # Reducing the remainders directly with `np.any` avoids allocating
+    # an intermediate boolean array (NaNs are non-zero as well)
+    return not np.any(np.mod(data, 1))
 
 
 def is_continuous(data: ArrayLike) -> bool:
@@ -23,6 +30,72 @@ def is_continuous(data: ArrayLike) -> bool:
 
 SMART_BIN_METHODS = ["sqrt", "sturges", "rice", "doane", "scott", "freedman–diaconis"]
 
+# Below this size, the overhead of calling the compiled kernel isn't worth it
+_KERNEL_MIN_SIZE = 10_000
+
+
+class _BinStats:
+    """Summary statistics of a dataset, as needed by the different `smart_bins` methods.
+
+    Each statistic is only computed when (and if) it is first requested. Reusing the same instance
+    across several `smart_bins` methods (see `compare_smart_bins`) means that each reduction over the
+    data is computed at most once.
+    """
+
+    def __init__(self, data: ArrayLike):
+        self.data = np.asarray(data)
+        self.n_observations = self.data.size
+
+    @cached_property
+    def _fused_min_max_std(self) -> Optional[Tuple[Any, Any, float]]:
+        # Reading a large array from memory once (instead of once per reduction)
+        # is significantly faster, but it requires the optional Numba kernel
+        if (
+            self.n_observations < _KERNEL_MIN_SIZE
+            # Numba doesn't support other float types (e.g. float16 or longdouble)
+            or not (self.data.dtype.kind in "iu" or self.data.dtype in (np.float32, np.float64))
+        ):
+            return None
+        min_max_std = get_min_max_std()
+        if min_max_std is None:
+            return None
+        data_min, data_max, std = min_max_std(self.data.ravel())
+        # NaNs are not handled by the kernel, so leave them to NumPy
+        return None if math.isnan(std) else (data_min, data_max, std)
+
+    @cached_property
+    def min_max(self) -> Tuple[Any, Any]:
+        if self._fused_min_max_std is not None:
+            return self._fused_min_max_std[:2]
+        return np.min(self.data), np.max(self.data)
+
+    @cached_property
+    def std(self) -> float:
+        if self._fused_min_max_std is not None:
+            return self._fused_min_max_std[2]
+        return float(np.std(self.data))
+
+    @cached_property
+    def iqr(self) -> float:
+        return float(np.subtract(*np.percentile(self.data, [75, 25])))
+
+    @cached_property
+    def skew(self) -> float:
+        return float(skew(self.data))
+
+    @cached_property
+    def n_unique(self) -> int:
+        # For integer arrays spanning a small range of values, counting occurrences with
+        # `np.bincount` is O(N), while `np.unique` needs to sort the whole array first.
+        if self.n_observations > 0 and np.issubdtype(self.data.dtype, np.integer):
+            data_min, data_max = int(self.min_max[0]), int(self.min_max[1])
+            # The values need to fit in an intp (e.g. not the case for large uint64 values)
+            if data_max <= np.iinfo(np.intp).max and data_max - data_min < 4 * self.n_observations:
+                # Subtracting in the array's own dtype could overflow (e.g. for int8 data)
+                offsets = self.data.ravel().astype(np.intp, copy=False) - data_min
+                return int(np.count_nonzero(np.bincount(offsets)))
+        return int(np.unique(self.data).size)
+
 
 def smart_bins(data: ArrayLike, method: str = "freedman–diaconis") -> int:
     """Get the "ideal" number of histogram bins for a given dataset.
@@ -36,12 +109,16 @@ def smart_bins(data: ArrayLike, method: str = "freedman–diaconis") -> int:
         - Shimazaki and Shinomoto's choice
 
     """
-    data = np.asarray(data)
-    n_observations = data.size
+    return _smart_bins(_BinStats(data), method=method)
+
+
+def _smart_bins(stats: _BinStats, method: str) -> int:
+    n_observations = stats.n_observations
 
     def get_nbins(bin_width: float) -> int:
         # The number of bins can be calculated from a given bin-width
-        return math.ceil((np.max(data) - np.min(data)) / bin_width)
+        data_min, data_max = stats.min_max
+        return math.ceil((data_max - data_min) / bin_width)
 
     # These first 4 method calculate the number of bins
     # directly (bypassing calculating the bin-width first)
@@ -53,15 +130,14 @@ def smart_bins(data: ArrayLike, method: str = "freedman–diaconis") -> int:
         n_bins = math.ceil(2 * n_observations ** (1 / 3.0))
     elif method == "doane":
         s = math.sqrt((6 * (n_observations - 2)) / ((n_observations + 1) * (n_observations + 3)))
-        n_bins = 1 + math.ceil(math.log2(n_observations) + math.log2(1 + abs(skew(data)) / s))
+        n_bins = 1 + math.ceil(math.log2(n_observations) + math.log2(1 + abs(stats.skew) / s))
 
     # These last 2 methods calculate the bin-width first, which is then
     # used to calculate the number of bins (see get_nbins)
     elif method == "scott":
-        n_bins = get_nbins(bin_width=3.49 * np.std(data) / (n_observations ** (1 / 3.0)))
+        n_bins = get_nbins(bin_width=3.49 * stats.std / (n_observations ** (1 / 3.0)))
     elif method == "freedman–diaconis":
-        iqr = np.subtract(*np.percentile(data, [75, 25]))
-        n_bins = get_nbins(bin_width=2 * iqr / (n_observations ** (1 / 3.0)))
+        n_bins = get_nbins(bin_width=2 * stats.iqr / (n_observations ** (1 / 3.0)))
 
     # TODO: There are much better ways to deal with this
     #       (e.g.: Enums, dicts, or a custom object...)
@@ -69,7 +145,7 @@ def smart_bins(data: ArrayLike, method: str = "freedman–diaconis") -> int:
         raise ValueError(f"Invalid method: {method}")
 
     # We should never use more bins than the number of possible values.
-    n_bins = min(n_bins, np.unique(data).size)
+    n_bins = min(n_bins, stats.n_unique)
     # TODO: Alternatively, only for discrete data
     # if is_discrete(data):
     #     n_bins = min(1 + np.max(data) - np.min(data), n_bins)
@@ -100,11 +176,13 @@ def compare_smart_bins(
     assert kwargs["nrows"] * kwargs["ncols"] == 6, "Expected 6 axes (e.g. 3 rows and 2 columns)"
     fig, axes = plt.subplots(squeeze=False, **kwargs)
     series = pd.Series(data)
+    # Share the same stats across all methods, so that they are only computed once
+    stats = _BinStats(data)
 
     for method, ax in zip(SMART_BIN_METHODS, axes.flatten()):
         kwargs = dict(density=True)
         kwargs.update(hist_kwargs if hist_kwargs else {})
-        bins = smart_bins(data, method)
+        bins = _smart_bins(stats, method=method)
         series.plot.hist(bins=bins, ax=ax, **kwargs)
         ax.set_title(f"{method} (bins={bins})")
 
@@ -1,13 +1,14 @@
+import inspect
 import logging
+import os
 from abc import ABCMeta
-from functools import partial
-from typing import Any, Optional
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from pathlib import Path
+from typing import Any, Callable, Optional
 from dataclasses import dataclass, field
 
-import dill
-import wrapt
-
-from maurice.caching import CACHE_DIR
+from maurice.caching import INDEX_DIR, load_blob, read_manifest, store_blob, write_manifest
 from maurice.types import (
     BoundMethodClassType,
     BoundMethodInstanceType,
@@ -19,19 +20,67 @@ from maurice.utils import hash_any
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+# Cache manifests that are known to exist (i.e. have already been written
+# or read from) in this process, so that we don't need to stat them again.
+# Only the most recently used ones are kept, so that a long-running process
+# caching many different calls doesn't grow this without bounds.
+_KNOWN_CACHE_PATHS_MAXSIZE = 4096
+_known_cache_paths: "OrderedDict[str, None]" = OrderedDict()
+
+
+# Each of the OrderedDict operations below is atomic, so these helpers can be called from
+# multiple threads (another thread may only ever evict or discard a path in between them)
+def _is_known_cache_path(path: str) -> bool:
+    try:
+        _known_cache_paths.move_to_end(path)
+    except KeyError:
+        return False
+    return True
+
+
+def _add_known_cache_path(path: str) -> None:
+    _known_cache_paths[path] = None
+    _is_known_cache_path(path)
+    while len(_known_cache_paths) > _KNOWN_CACHE_PATHS_MAXSIZE:
+        try:
+            _known_cache_paths.popitem(last=False)
+        except KeyError:  # pragma: no cover
+            break
+
+
+def _discard_known_cache_path(path: str) -> None:
+    _known_cache_paths.pop(path, None)
+
+
+@lru_cache(maxsize=1024)
+def _get_class_index_dir(cls: type) -> Path:
+    # The index directory of a class never changes, so there is
+    # no need to rebuild it (and split the module path) on every call
+    return INDEX_DIR.joinpath(*cls.__module__.split("."), cls.__name__)
+
+
+@dataclass(frozen=True)
 class ArgsKwargs:
     args: tuple = field(default_factory=tuple)
     kwargs: dict = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(frozen=True)
 class RunBeforeResult:
     run_wrapped_method: bool = True
     run_after_callback: bool = True
     new_args_kwargs: Optional[ArgsKwargs] = None
 
 
+# Results are immutable, so the common ones can be shared
+# instead of allocating a new instance on every method call
+_DEFAULT_RUN_BEFORE_RESULT = RunBeforeResult()
+_SKIP_WRAPPED_METHOD_RESULT = RunBeforeResult(run_wrapped_method=False)
+
+# Sentinel for wrapped method calls whose result was not loaded from the cache
+_NOT_LOADED = object()
+
+
 class BaseMethodWrapper(metaclass=ABCMeta):
     """
     Notes:
@@ -51,7 +100,7 @@ class BaseMethodWrapper(metaclass=ABCMeta):
         return self.__method.__self__
 
     def _run_before(self) -> RunBeforeResult:
-        return RunBeforeResult()
+        return _DEFAULT_RUN_BEFORE_RESULT
 
     def _run_after(self, result: Optional[BoundMethodReturnType]) -> Any:
         return result
@@ -60,8 +109,9 @@ class BaseMethodWrapper(metaclass=ABCMeta):
         result = None
         run_before_result = self._run_before()
         if run_before_result.run_wrapped_method:
-            if run_before_result.new_args_kwargs is not None:
-                args, kwargs = run_before_result.new_args_kwargs
+            new_args_kwargs = run_before_result.new_args_kwargs
+            if new_args_kwargs is not None:
+                args, kwargs = new_args_kwargs.args, new_args_kwargs.kwargs
             else:
                 args, kwargs = self._args, self._kwargs
             result = self.__method(*args, **kwargs)
@@ -71,25 +121,46 @@ class BaseMethodWrapper(metaclass=ABCMeta):
 
 
 class CachingMethodWrapper(BaseMethodWrapper):
-    def __init__(self, method: BoundMethodType, args: tuple, kwargs: dict, save_state: bool):
+    """
+    Notes:
+        - When `save_state=True`, the cache key includes a hash of the instance state. If the method's outcome
+        only depends on part of that state, pass a `state_key` callable that extracts it from the state dict.
+        This avoids hashing (potentially large) attributes that can't affect the cached result.
+        - Without a `state_key`, methods that don't change the instance state (e.g. `predict`) don't store it
+        either. A cache hit then skips loading and restoring the state altogether.
+    """
+
+    def __init__(
+        self,
+        method: BoundMethodType,
+        args: tuple,
+        kwargs: dict,
+        save_state: bool,
+        state_key: Optional[Callable[[dict], Any]] = None,
+    ):
         super(CachingMethodWrapper, self).__init__(method=method, args=args, kwargs=kwargs)
         self._save_state = save_state
+        self._state_key = state_key
 
-        state_string = hash_any(self._get_instance_state()) if self._save_state else "ignore_state"
-        self._path_to_cached_method = CACHE_DIR.joinpath(
-            # path to module
-            *type(self._instance).__module__.split("."),
-            # class name
-            type(self._instance).__name__,
+        if self._save_state:
+            state = self._get_instance_state()
+            state_string = hash_any(state_key(state) if state_key is not None else state)
+        else:
+            state_string = "ignore_state"
+        args_string = hash_any((args, kwargs))
+        self._state_string = state_string
+        # lru_cache needs a hashable argument, which `type[BoundMethodInstanceType]` isn't to mypy
+        cls: type = type(self._instance)
+        self._path_to_manifest = _get_class_index_dir(cls).joinpath(
             # instance state hash
             state_string,
             # instance method name
             method.__name__,
             # args and kwargs hash
-            hash_any((args, kwargs)),
+            f"{args_string}.json",
         )
-        self._path_to_state = self._path_to_cached_method.joinpath("state.dill")
-        self._path_to_result = self._path_to_cached_method.joinpath("result.dill")
+        self._manifest_str = str(self._path_to_manifest)
+        self._cached_result: Any = _NOT_LOADED
 
     def _get_instance_state(self) -> dict:
         if hasattr(self._instance, "__getstate__"):
@@ -104,41 +175,99 @@ class CachingMethodWrapper(BaseMethodWrapper):
         else:
             self._instance.__dict__.update(state)
 
+    def _is_cached(self) -> bool:
+        if _is_known_cache_path(self._manifest_str):
+            return True
+        if os.path.exists(self._manifest_str):
+            _add_known_cache_path(self._manifest_str)
+            return True
+        return False
+
+    def _load_cache(self) -> Any:
+        logger.info(f"Loading cache from: {self._path_to_manifest}")
+        # Load every blob before touching the instance, so that a missing
+        # blob doesn't leave the instance with a partially restored state
+        blobs = {
+            name: load_blob(digest)
+            for name, digest in read_manifest(self._path_to_manifest).items()
+        }
+        if "state" in blobs:
+            self._set_instance_state(blobs["state"])
+        return blobs["result"]
+
     def _run_before(self) -> RunBeforeResult:
-        return RunBeforeResult(
-            run_wrapped_method=not self._path_to_cached_method.exists(),
-        )
+        if self._is_cached():
+            try:
+                self._cached_result = self._load_cache()
+            except FileNotFoundError:
+                # e.g. the cache directory was deleted while this process was running
+                logger.warning(f"Incomplete cache entry, recomputing: {self._path_to_manifest}")
+                _discard_known_cache_path(self._manifest_str)
+            else:
+                return _SKIP_WRAPPED_METHOD_RESULT
+        return _DEFAULT_RUN_BEFORE_RESULT
 
     def _run_after(self, result: Optional[BoundMethodReturnType]) -> Any:
+        if self._cached_result is not _NOT_LOADED:
+            return self._cached_result
         if result is not None:
-            logger.info(f"Saving cache to: {self._path_to_cached_method}")
-            self._path_to_cached_method.mkdir(parents=True, exist_ok=False)
+            logger.info(f"Saving cache to: {self._path_to_manifest}")
+            blobs = {"result": store_blob(result)}
             if self._save_state:
-                self._path_to_state.write_bytes(dill.dumps(self._get_instance_state()))
-            self._path_to_result.write_bytes(dill.dumps(result))
-        else:
-            logger.info(f"Loading cache from: {self._path_to_cached_method}")
-            if self._save_state:
-                self._set_instance_state(dill.loads(self._path_to_state.read_bytes()))
-            result = dill.loads(self._path_to_result.read_bytes())
+                state = self._get_instance_state()
+                # If the full state is part of the cache key and the method didn't change it, any
+                # future cache hit will already start from this exact state (so no need to save it)
+                if self._state_key is not None or hash_any(state) != self._state_string:
+                    blobs["state"] = store_blob(state)
+            write_manifest(self._path_to_manifest, blobs=blobs)
+            _add_known_cache_path(self._manifest_str)
         return result
 
 
-def _caching_method_wrapper(
-    method: BoundMethodType, _: BoundMethodInstanceType, args: tuple, kwargs: dict, save_state: bool
-) -> Any:
-    return CachingMethodWrapper(
-        method=method, args=args, kwargs=kwargs, save_state=save_state
-    ).run()
+# Set on the caching methods installed by `patch_method_with_caching`
+_CACHING_METHOD_MARKER = "__maurice_caching__"
+
+
+def _make_caching_method(
+    function: Callable[..., Any],
+    save_state: bool,
+    state_key: Optional[Callable[[dict], Any]],
+) -> Callable[..., Any]:
+    """Build the caching counterpart of a method.
+
+    This is a plain function (and therefore a descriptor, like the method it replaces), which is a lot
+    lighter than a `wrapt.FunctionWrapper`. It also keeps `inspect.isfunction()` and, through
+    `__wrapped__`, `inspect.signature()` working for introspection-based tools like sklearn's
+    metadata routing.
+    """
+
+    # `instance` is positional-only, so that it can't clash with the wrapped method's kwargs
+    @wraps(function)
+    def caching_method(instance: BoundMethodInstanceType, /, *args: Any, **kwargs: Any) -> Any:
+        return CachingMethodWrapper(
+            method=function.__get__(instance, type(instance)),
+            args=args,
+            kwargs=kwargs,
+            save_state=save_state,
+            state_key=state_key,
+        ).run()
+
+    setattr(caching_method, _CACHING_METHOD_MARKER, True)
+    return caching_method
 
 
-def patch_method_by_name(name: str, cls: type) -> None:
-    pass
+def _is_caching_method(function: Any) -> bool:
+    return getattr(function, _CACHING_METHOD_MARKER, False) is True
 
 
-def patch_method_with_caching(name: str, cls: BoundMethodClassType, save_state: bool) -> None:
-    wrapt.wrap_function_wrapper(
-        module=cls.__module__,
-        name=f"{cls.__name__}.{name}",
-        wrapper=partial(_caching_method_wrapper, save_state=save_state),
-    )
+def patch_method_with_caching(
+    name: str,
+    cls: BoundMethodClassType,
+    save_state: bool,
+    state_key: Optional[Callable[[dict], Any]] = None,
+) -> None:
+    function = inspect.getattr_static(cls, name)
+    if _is_caching_method(function):
+        # Already patched (either directly or through a parent class)
+        return
+    setattr(cls, name, _make_caching_method(function, save_state=save_state, state_key=state_key))
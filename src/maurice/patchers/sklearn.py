@@ -1,13 +1,67 @@
+import inspect
 import logging
+import pkgutil
+import sys
+from types import ModuleType
+from typing import Set, cast
 
-from sklearn.utils import all_estimators
+import wrapt
 
 from maurice.patchers.core import patch_method_with_caching
+from maurice.types import BoundMethodClassType
 
 logger = logging.getLogger(__name__)
 
+# Same modules that are skipped by sklearn.utils.all_estimators()
+_IGNORED_MODULES = {"tests", "externals", "setup", "conftest", "experimental", "estimator_checks"}
+
+_patched_estimators: Set[type] = set()
+
+
+def _get_estimator_state_key(state: dict) -> dict:
+    # With warm_start=True, fit() continues from the previously fitted state
+    if state.get("warm_start"):
+        return state
+    # Otherwise, the result of fit() doesn't depend on previously fitted
+    # attributes, which by convention end with an underscore (e.g. `coef_`)
+    return {k: v for k, v in state.items() if not k.endswith("_")}
+
+
+def _patch_module_estimators(module: ModuleType) -> None:
+    # Modules imported while sklearn.base is itself still being imported
+    # can't define any estimators, so it's fine to skip them here
+    base_estimator = getattr(sys.modules.get("sklearn.base"), "BaseEstimator", None)
+    if base_estimator is not None:
+        # Not using inspect.getmembers() since it could trigger lazily-loaded attributes
+        for name, obj in list(vars(module).items()):
+            if (
+                name.startswith("_")
+                or not inspect.isclass(obj)
+                or obj in _patched_estimators
+                or obj is base_estimator
+                or not issubclass(obj, base_estimator)
+                or inspect.isabstract(obj)
+                or not hasattr(obj, "fit")
+            ):
+                continue
+            _patched_estimators.add(obj)
+            patch_method_with_caching(
+                name="fit",
+                cls=cast(BoundMethodClassType, obj),
+                save_state=True,
+                state_key=_get_estimator_state_key,
+            )
+
+    # Only patch the public submodules once (and if) they are imported
+    for module_info in pkgutil.iter_modules(getattr(module, "__path__", ())):
+        if not module_info.name.startswith("_") and module_info.name not in _IGNORED_MODULES:
+            wrapt.register_post_import_hook(
+                _patch_module_estimators, f"{module.__name__}.{module_info.name}"
+            )
+
 
 def caching_patch_sklearn_estimators() -> None:
     logger.debug("Patching sklearn estimators (CACHING)...")
-    for cls in tuple(zip(*all_estimators()))[1]:
-        patch_method_with_caching(name="fit", cls=cls, save_state=True)
+    # Instead of importing every single sklearn module upfront (which is what
+    # all_estimators() does), estimators are patched as their modules get imported
+    wrapt.register_post_import_hook(_patch_module_estimators, "sklearn")
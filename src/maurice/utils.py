@@ -1,8 +1,79 @@
 import hashlib
-from typing import Any
+import pickle
+from types import FunctionType, ModuleType
+from typing import IO, Any, List, Optional
 
 import dill
 
+# xxhash is an optional (but recommended) dependency
+xxhash: Optional[ModuleType]
+try:
+    import xxhash
+except ImportError:  # pragma: no cover
+    xxhash = None
+
+
+def new_hasher() -> Any:
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    # We don't need a cryptographic hash here, but blake2b
+    # is still a lot faster than md5 on modern CPUs
+    return hashlib.blake2b(digest_size=16)
+
+
+class HashingWriter:
+    """Write-only file-like object that hashes everything written to it.
+
+    If a file is given, the written data is also passed through to it (e.g. to hash a payload
+    while it is being stored).
+    """
+
+    def __init__(self, file: Optional[IO[bytes]] = None):
+        self._file = file
+        self.hasher = new_hasher()
+
+    def write(self, data: Any) -> int:
+        self.hasher.update(data)
+        if self._file is None:
+            return memoryview(data).nbytes
+        return self._file.write(data)
+
+
+class ImportablePickler(pickle.Pickler):
+    """Pickler that refuses to serialize anything defined in `__main__`.
+
+    The standard pickle module stores functions and classes by reference (i.e. by name). For objects
+    defined in a script or notebook, that name can point to a different definition later on, which
+    would silently produce stale cache entries. Callers are expected to catch the `PicklingError`
+    and fall back to dill, which serializes these objects by value.
+    """
+
+    def reducer_override(self, obj: Any) -> Any:
+        if isinstance(obj, (FunctionType, type)):
+            module = obj.__module__
+        else:
+            module = type(obj).__module__
+        if module == "__main__":
+            raise pickle.PicklingError(f"{obj!r} is defined in __main__")
+        return NotImplemented
+
 
 def hash_any(obj: Any) -> str:
-    return hashlib.md5(dill.dumps(obj)).hexdigest()
+    writer = HashingWriter()
+    # With protocol 5, large contiguous buffers (e.g. numpy arrays) are
+    # passed out-of-band and hashed below without being copied first
+    buffers: List[pickle.PickleBuffer] = []
+    try:
+        ImportablePickler(writer, protocol=5, buffer_callback=buffers.append).dump(obj)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        # dill is much slower than pickle, but it is able to serialize a lot
+        # more objects (e.g. lambdas) and stores __main__ objects by value
+        writer = HashingWriter()
+        buffers.clear()
+        # Nothing is passed out-of-band here, so stream the (potentially large)
+        # payload into the hasher instead of materialising it in memory first
+        dill.dump(obj, writer)
+    for buffer in buffers:
+        writer.hasher.update(buffer.raw())
+    hash_str: str = writer.hasher.hexdigest()
+    return hash_str
@@ -0,0 +1,90 @@
+import os
+import stat
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import maurice.caching
+from maurice.caching import load_blob, read_manifest, store_blob, write_manifest
+
+
+@pytest.fixture(autouse=True)
+def blobs_dir(tmp_path: Path, monkeypatch) -> Path:
+    blobs_dir = tmp_path.joinpath("blobs")
+    monkeypatch.setattr(maurice.caching, "BLOBS_DIR", blobs_dir)
+    return blobs_dir
+
+
+@pytest.mark.parametrize(
+    "obj",
+    (
+        42,
+        "Hello, World!",
+        {"a": 1, 1: "a", "nested": {"I": "am", "nested": "indeed"}},
+        np.arange(1000, dtype=float),
+    ),
+)
+def test_store_and_load_blob(obj) -> None:
+    digest = store_blob(obj)
+    assert isinstance(digest, str)
+    np.testing.assert_equal(load_blob(digest), obj)
+
+
+def test_store_blob_deduplicates_identical_payloads(blobs_dir: Path) -> None:
+    digest = store_blob({"arr": np.arange(10)})
+    assert store_blob({"arr": np.arange(10)}) == digest
+    assert store_blob({"arr": np.arange(11)}) != digest
+    # no temporary files should be left behind
+    assert len(list(blobs_dir.iterdir())) == 2
+
+
+def test_store_blob_falls_back_to_dill() -> None:
+    digest = store_blob(lambda x: x + 1)
+    assert load_blob(digest)(1) == 2
+
+
+@pytest.mark.skipif(maurice.caching.zstandard is None, reason="zstandard is not installed")
+def test_store_blob_compression(blobs_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    obj = {"arr": np.zeros(10_000)}
+    digest = store_blob(obj)
+    assert blobs_dir.joinpath(digest).read_bytes().startswith(maurice.caching._ZSTD_MAGIC)
+    # blobs stored without compression can still be loaded
+    with monkeypatch.context() as m:
+        m.setattr(maurice.caching, "zstandard", None)
+        uncompressed_digest = store_blob(obj)
+    assert uncompressed_digest != digest
+    np.testing.assert_equal(load_blob(uncompressed_digest), obj)
+    np.testing.assert_equal(load_blob(digest), obj)
+
+
+def test_store_blob_main_objects_by_value(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Same as defining a function in a script or notebook
+    namespace = vars(sys.modules["__main__"])
+    monkeypatch.setitem(namespace, "f", None)
+    exec("def f(x): return x + 1", namespace)
+    digest = store_blob({"func": namespace["f"]})
+    exec("def f(x): return x * 100", namespace)
+    # the stored function is the one that was stored, not the current definition
+    assert load_blob(digest)["func"](1) == 2
+
+
+def test_write_and_read_manifest(tmp_path: Path) -> None:
+    path = tmp_path.joinpath("some", "nested", "manifest.json")
+    blobs = {"result": "abc", "state": "def"}
+    write_manifest(path, blobs=blobs)
+    assert read_manifest(path) == blobs
+    assert list(path.parent.iterdir()) == [path]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX file permissions")
+def test_cached_files_respect_the_umask(blobs_dir: Path, tmp_path: Path) -> None:
+    blob_path = blobs_dir.joinpath(store_blob(np.arange(3)))
+    manifest_path = tmp_path.joinpath("manifest.json")
+    write_manifest(manifest_path, blobs={"result": "abc"})
+    # i.e. the same permissions as any other new file (and not owner-only)
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(blob_path.stat().st_mode) == 0o666 & ~umask
+    assert stat.S_IMODE(manifest_path.stat().st_mode) == 0o666 & ~umask
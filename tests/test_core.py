@@ -0,0 +1,140 @@
+import json
+import multiprocessing
+import shutil
+from pathlib import Path
+
+import pytest
+
+import maurice.caching
+import maurice.patchers.core
+from maurice.patchers.core import (
+    ArgsKwargs,
+    BaseMethodWrapper,
+    RunBeforeResult,
+    patch_method_with_caching,
+)
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path: Path, monkeypatch) -> Path:
+    monkeypatch.setattr(maurice.caching, "BLOBS_DIR", tmp_path.joinpath("blobs"))
+    monkeypatch.setattr(maurice.patchers.core, "INDEX_DIR", tmp_path.joinpath("index"))
+    maurice.patchers.core._get_class_index_dir.cache_clear()
+    maurice.patchers.core._known_cache_paths.clear()
+    return tmp_path
+
+
+class Model:
+    n_calls = 0
+
+    def __init__(self) -> None:
+        self.weight = 0
+
+    def fit(self, weight: int) -> "Model":
+        Model.n_calls += 1
+        self.weight = weight
+        return self
+
+    def predict(self, x: int) -> int:
+        Model.n_calls += 1
+        return self.weight * x
+
+
+patch_method_with_caching(name="fit", cls=Model, save_state=True)
+patch_method_with_caching(name="predict", cls=Model, save_state=True)
+
+
+@pytest.fixture(autouse=True)
+def reset_n_calls() -> None:
+    Model.n_calls = 0
+
+
+def test_caching_restores_state() -> None:
+    Model().fit(3)
+    model = Model()
+    model.fit(3)
+    assert model.weight == 3
+    assert Model.n_calls == 1
+    model.fit(4)
+    assert model.weight == 4
+    assert Model.n_calls == 2
+
+
+def test_unchanged_state_is_not_stored(cache_dir: Path) -> None:
+    model = Model().fit(3)
+    assert model.predict(2) == model.predict(2) == 6
+    assert Model.n_calls == 2
+    manifests = {p.parent.name: json.loads(p.read_text()) for p in cache_dir.rglob("*.json")}
+    assert set(manifests["fit"]) == {"result", "state"}
+    assert set(manifests["predict"]) == {"result"}
+
+
+@pytest.mark.parametrize("deleted_dir", ("", "blobs"))
+def test_deleted_cache_is_recomputed(cache_dir: Path, deleted_dir: str) -> None:
+    Model().fit(3)
+    # e.g. the whole cache (or only the blobs) deleted while the process is running
+    shutil.rmtree(cache_dir.joinpath(deleted_dir))
+    model = Model()
+    model.fit(3)
+    assert model.weight == 3
+    assert Model.n_calls == 2
+    # the entry is written again, so the next call is a cache hit
+    Model().fit(3)
+    assert Model.n_calls == 2
+
+
+def test_known_cache_paths_are_bounded(monkeypatch) -> None:
+    monkeypatch.setattr(maurice.patchers.core, "_KNOWN_CACHE_PATHS_MAXSIZE", 2)
+    known_cache_paths = maurice.patchers.core._known_cache_paths
+    for weight in (1, 2, 3):
+        Model().fit(weight)
+    assert len(known_cache_paths) == 2
+    # evicted paths are only stat'ed again, so the cache is still hit
+    for weight in (1, 2, 3):
+        assert Model().fit(weight).weight == weight
+    assert Model.n_calls == 3
+    assert len(known_cache_paths) == 2
+
+
+def _fit_and_predict(weight: int) -> int:
+    return Model().fit(weight).predict(2)
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="requires the fork start method"
+)
+def test_caching_in_forked_processes() -> None:
+    # Calling a patched method in the parent first must not leave any
+    # state behind (e.g. threads or locks) that deadlocks the children
+    assert _fit_and_predict(3) == 6
+    with multiprocessing.get_context("fork").Pool(2) as pool:
+        assert pool.map_async(_fit_and_predict, [3, 4]).get(timeout=30) == [6, 8]
+
+
+def test_wrapped_method_can_take_an_instance_kwarg() -> None:
+    class Wrapper:
+        def fit(self, instance: int) -> int:
+            return instance
+
+    patch_method_with_caching(name="fit", cls=Wrapper, save_state=False)
+    assert Wrapper().fit(instance=3) == 3
+
+
+def test_patching_twice_is_a_noop() -> None:
+    method = Model.__dict__["fit"]
+    patch_method_with_caching(name="fit", cls=Model, save_state=True)
+    assert Model.__dict__["fit"] is method
+
+
+def test_run_before_can_replace_args() -> None:
+    class DoubleArgsWrapper(BaseMethodWrapper):
+        def _run_before(self) -> RunBeforeResult:
+            return RunBeforeResult(new_args_kwargs=ArgsKwargs(args=(2 * self._args[0],)))
+
+    class Adder:
+        def add(self, x: int, y: int = 1) -> int:
+            return x + y
+
+    wrapper = DoubleArgsWrapper(method=Adder().add, args=(3,), kwargs={"y": 2})
+    # new_args_kwargs replaces both the args and the kwargs
+    assert wrapper.run() == 7
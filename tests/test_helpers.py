@@ -1,10 +1,17 @@
+import importlib.util
+import math
+import subprocess
+import sys
 from itertools import product
 
 import numpy as np
 import pytest
 
+from maurice._kernels import get_min_max_std
 from maurice.helpers import (
+    _KERNEL_MIN_SIZE,
     SMART_BIN_METHODS,
+    _BinStats,
     compare_smart_bins,
     is_continuous,
     is_discrete,
@@ -14,7 +21,14 @@ from maurice.types import ArrayLike
 
 
 @pytest.mark.parametrize(
-    "data,expected", (([1, 2, 3, 4], True), ([1.0, 2.0, 3.0, 4.0], True), ([1.2, 2, 3, 4], False))
+    "data,expected",
+    (
+        ([1, 2, 3, 4], True),
+        ([1.0, 2.0, 3.0, 4.0], True),
+        ([1.2, 2, 3, 4], False),
+        ([True, False], True),
+        ([1.0, np.nan], False),
+    ),
 )
 def test_is_discrete(data, expected) -> None:
     assert is_discrete(data) is expected
@@ -32,6 +46,9 @@ data = [
     np.random.laplace(loc=0.0, scale=1, size=1000),
     np.random.lognormal(mean=1.0, sigma=0.8, size=1200),
     np.random.poisson(lam=10, size=300),
+    # narrow integer types with negative values
+    np.array(list(range(-128, 128)) * 40, dtype=np.int8),
+    np.random.randint(-20_000, 20_000, size=12_000).astype(np.int16),
 ]
 
 
@@ -44,10 +61,69 @@ def test_smart_bins(data: ArrayLike, method: str) -> None:
     assert isinstance(bins, int)
     assert bins <= np.unique(data).size
     if is_discrete(data):
-        assert bins <= 1 + np.max(data) - np.min(data)
+        assert bins <= 1 + int(np.max(data)) - int(np.min(data))
+
+
+large_uints = np.array([2**64 - 5, 2**64 - 1, 2**64 - 3] * 10, dtype=np.uint64)
+empty_ints = np.array([], dtype=int)
+
+
+@pytest.mark.parametrize(
+    "data,method,expected",
+    (
+        # integer values that don't fit in an intp
+        (large_uints, "sqrt", 3),
+        (large_uints, "sturges", 3),
+        (large_uints, "rice", 3),
+        # empty integer arrays
+        (empty_ints, "sqrt", 0),
+        (empty_ints, "rice", 0),
+    ),
+)
+def test_smart_bins_integer_edge_cases(data: np.ndarray, method: str, expected: int) -> None:
+    assert smart_bins(data=data, method=method) == expected
 
 
 @pytest.mark.parametrize("i,data", (*enumerate(data),))
 def test_compare_smart_bins(i: int, data: ArrayLike) -> None:
     fig = compare_smart_bins(data=data)
     # fig.savefig(f"./tests/test_compare_smart_bins_{i}.png")
+
+
+@pytest.mark.skipif(importlib.util.find_spec("numba") is None, reason="requires numba")
+@pytest.mark.parametrize("data", (*data, np.arange(-50, 50)))
+def test_min_max_std_kernel(data: np.ndarray) -> None:
+    min_max_std = get_min_max_std()
+    assert min_max_std is not None
+    data_min, data_max, std = min_max_std(data)
+    assert data_min == np.min(data)
+    assert data_max == np.max(data)
+    assert std == pytest.approx(np.std(data))
+
+
+@pytest.mark.parametrize(
+    "dtype", (np.int8, np.int64, np.float16, np.float32, np.float64, np.longdouble)
+)
+def test_bin_stats_large_arrays(dtype: type) -> None:
+    # Large enough to be computed by the Numba kernel (when installed and the dtype is supported)
+    # (a small scale for floats, so that NumPy's own float16 reductions don't overflow)
+    scale = 20 if np.dtype(dtype).kind == "i" else 1
+    data = np.random.normal(scale=scale, size=2 * _KERNEL_MIN_SIZE).astype(dtype)
+    stats = _BinStats(data)
+    assert stats.min_max == (np.min(data), np.max(data))
+    assert stats.std == pytest.approx(np.std(data), rel=1e-3)
+    for method in SMART_BIN_METHODS:
+        assert isinstance(smart_bins(data=data, method=method), int)
+
+
+def test_bin_stats_large_arrays_with_nans() -> None:
+    data = np.random.normal(size=2 * _KERNEL_MIN_SIZE)
+    data[100] = np.nan
+    stats = _BinStats(data)
+    assert all(math.isnan(x) for x in stats.min_max)
+    assert math.isnan(stats.std)
+
+
+def test_numba_is_imported_lazily() -> None:
+    code = "import sys, maurice.helpers; assert 'numba' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
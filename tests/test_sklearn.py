@@ -0,0 +1,60 @@
+import inspect
+
+import pytest
+from sklearn.utils import all_estimators
+
+from maurice.patchers.core import _is_caching_method
+from maurice.patchers.sklearn import _get_estimator_state_key, caching_patch_sklearn_estimators
+
+
+def test_caching_patch_sklearn_estimators() -> None:
+    caching_patch_sklearn_estimators()
+    # estimators are patched as (and only once) their modules get imported
+    from sklearn.cross_decomposition import PLSRegression
+
+    assert _is_caching_method(inspect.getattr_static(PLSRegression, "fit"))
+
+    # all_estimators() imports all the remaining (public) sklearn modules
+    methods = {}
+    for name, cls in all_estimators():
+        method = inspect.getattr_static(cls, "fit")
+        assert _is_caching_method(method), name
+        # still a plain function, as expected by introspection-based tools (e.g. metadata routing)
+        assert inspect.isfunction(method), name
+        # each class is patched only once, i.e. caching wrappers are never nested
+        assert not _is_caching_method(method.__wrapped__), name
+        methods[cls] = method
+
+    # patching again is a no-op
+    caching_patch_sklearn_estimators()
+    for cls, method in methods.items():
+        assert inspect.getattr_static(cls, "fit") is method
+
+
+def test_patched_estimators_keep_their_metadata_routing() -> None:
+    from sklearn.linear_model import LogisticRegression
+
+    caching_patch_sklearn_estimators()
+    assert _is_caching_method(inspect.getattr_static(LogisticRegression, "fit"))
+    assert inspect.isfunction(LogisticRegression.fit)
+    routing = LogisticRegression().get_metadata_routing()
+    assert routing._get_param_names(method="fit", return_alias=False) == {"sample_weight"}
+
+
+@pytest.mark.parametrize(
+    "state,expected",
+    (
+        # fitted attributes (with a trailing underscore) don't affect the result of fit()
+        ({"C": 1.0, "coef_": [1, 2], "n_features_in_": 2}, {"C": 1.0}),
+        ({"C": 1.0, "warm_start": False, "coef_": [1, 2]}, {"C": 1.0, "warm_start": False}),
+        # ...unless fit() continues from the previously fitted state
+        (
+            {"C": 1.0, "warm_start": True, "coef_": [1, 2]},
+            {"C": 1.0, "warm_start": True, "coef_": [1, 2]},
+        ),
+        # private attributes (with a leading underscore) are kept
+        ({"_private": 1, "private_": 2}, {"_private": 1}),
+    ),
+)
+def test_get_estimator_state_key(state: dict, expected: dict) -> None:
+    assert _get_estimator_state_key(state) == expected
@@ -1,16 +1,21 @@
+import io
+import sys
 from pathlib import Path
 
+import numpy as np
 import pytest
 
-from maurice.utils import hash_any
+import maurice.utils
+from maurice.utils import HashingWriter, hash_any, new_hasher
 
 
+@pytest.mark.skipif(maurice.utils.xxhash is None, reason="requires xxhash")
 @pytest.mark.parametrize(
     "obj,expected_hash",
     (
         # simple types like int and str
-        (42, "0837e03ec8dab5a359b25740047e415f"),
-        ("Hello, World!", "4b25fee49251a68a90b925dc611a4f8d"),
+        (42, "01eca9b9b51b6d13903e916cde8e26bd"),
+        ("Hello, World!", "729fdbe8c831f51b39920df5164ec55d"),
         # a more complex and nexted object
         (
             [
@@ -18,7 +23,7 @@ from maurice.utils import hash_any
                 open(Path(__file__)),
                 {"a": 1, 1: "a", "nested": {"I": "am", "nested": "indeed"}},
             ],
-            "d10c2f17ee467ac4d90d44c9f031b04d",
+            "4b756ff840207809e9c29020f7fc3ae8",
         ),
     ),
 )
@@ -26,3 +31,45 @@ def test_hash_any(obj, expected_hash: str) -> None:
     hash_str = hash_any(obj=obj)
     assert isinstance(hash_str, str)
     assert hash_str == expected_hash
+
+
+@pytest.mark.parametrize("use_xxhash", (True, False))
+def test_hash_any_numpy_buffers(use_xxhash: bool, monkeypatch) -> None:
+    if not use_xxhash:
+        monkeypatch.setattr(maurice.utils, "xxhash", None)
+    arr = np.arange(1000, dtype=float)
+    assert hash_any(arr) == hash_any(arr.copy())
+    assert hash_any(arr) != hash_any(arr + 1)
+    assert hash_any(arr) != hash_any(arr.reshape(10, 100))
+    # Both backends produce 128-bit digests
+    assert len(hash_any(arr)) == 32
+
+
+def _define_in_main(monkeypatch, source: str) -> dict:
+    # Same as defining objects in a script or notebook
+    namespace = vars(sys.modules["__main__"])
+    for name in ("f", "C"):
+        monkeypatch.setitem(namespace, name, None)
+    exec(source, namespace)
+    return namespace
+
+
+def test_hash_any_main_objects_by_value(monkeypatch) -> None:
+    namespace = _define_in_main(monkeypatch, "def f(x): return x + 1\nclass C: k = 1")
+    hashes = (hash_any({"func": namespace["f"]}), hash_any(namespace["C"]()))
+    # redefining them must change their hash
+    namespace = _define_in_main(monkeypatch, "def f(x): return x * 100\nclass C: k = 2")
+    assert hash_any({"func": namespace["f"]}) != hashes[0]
+    assert hash_any(namespace["C"]()) != hashes[1]
+
+
+@pytest.mark.parametrize("file", (None, io.BytesIO()))
+def test_hashing_writer(file) -> None:
+    writer = HashingWriter(file)
+    assert writer.write(b"Hello, ") == 7
+    assert writer.write(memoryview(b"World!")) == 6
+    expected = new_hasher()
+    expected.update(b"Hello, World!")
+    assert writer.hasher.hexdigest() == expected.hexdigest()
+    if file is not None:
+        assert file.getvalue() == b"Hello, World!"